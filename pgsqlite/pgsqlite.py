@@ -7,10 +7,14 @@ import json
 import sqlite3
 import psycopg
 from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
 from pprint import pprint
 from psycopg.sql import SQL, Identifier, Literal
+import re
 import sys
 import logging
+from functools import cached_property
+from collections import defaultdict
 import structlog
 import argparse
 import asyncio
@@ -21,6 +25,88 @@ _IGNORE_TRIGGERS=True
 _IGNORE_VIEWS=True
 SQLITE_SYSTEM_TABLES = ["sqlite_sequence", "sqlite_stat1", "sqlite_user"]
 
+# Number of SQLite rows fetched (and accounted for) per batch during COPY
+COPY_BATCH_SIZE = 1000
+
+# Maps the transpiled Postgres column type (sans any length/precision suffix)
+# to the psycopg type name passed to Copy.set_types() for binary COPY. Types
+# missing from this map (e.g. NUMERIC, where the binary wire format depends on
+# the column definition) make the whole table fall back to text-format COPY.
+PG_BINARY_COPY_TYPES = {
+    "SMALLINT": "int2",
+    "INT": "int4",
+    "INTEGER": "int4",
+    "BIGINT": "int8",
+    "REAL": "float4",
+    "DOUBLE PRECISION": "float8",
+    "TEXT": "text",
+    "VARCHAR": "text",
+    "CHAR": "text",
+    "BOOLEAN": "bool",
+    "BYTEA": "bytea",
+    # No TIMESTAMP/DATE here on purpose: SQLite stores those as text in
+    # whatever ISO-8601 flavor the writer used, and Postgres's own input
+    # parsing (via text COPY) is far more forgiving than anything we could
+    # pre-parse into datetime objects client-side
+}
+
+# All the spellings a SQLite BOOLEAN column can hand us (integers per the type
+# affinity rules, plus common text forms, lowercased before lookup). A single
+# hashed lookup replaces the branch-and-method-call chain per cell.
+BOOLEAN_VALUE_MAP = {
+    0: False,
+    1: True,
+    "0": False,
+    "1": True,
+    "f": False,
+    "t": True,
+    "false": False,
+    "true": True,
+}
+
+# Escapes for COPY text format, applied with str.translate — a single
+# C-level pass per string cell, much cheaper than per-character Python checks
+COPY_TEXT_ESCAPES = str.maketrans({
+    "\\": "\\\\",
+    "\t": "\\t",
+    "\n": "\\n",
+    "\r": "\\r",
+})
+
+
+def encode_copy_text_row(row: Any) -> str:
+    """Render one row in COPY text format (tab-separated, \\N for NULL)."""
+    parts = []
+    for val in row:
+        if val is None:
+            parts.append("\\N")
+        elif isinstance(val, str):
+            parts.append(val.translate(COPY_TEXT_ESCAPES))
+        elif val is True:
+            parts.append("t")
+        elif val is False:
+            parts.append("f")
+        elif isinstance(val, (bytes, memoryview)):
+            # bytea hex form; the backslash itself needs the COPY escape
+            parts.append("\\\\x" + bytes(val).hex())
+        else:
+            parts.append(str(val))
+    return "\t".join(parts) + "\n"
+
+
+# Matches one CHECK constraint per DDL line (the CREATE TABLE text in
+# sqlite_master is line-oriented); the capture keeps any leading column
+# definition the constraint is attached to, minus indentation and the
+# trailing comma
+CHECK_CONSTRAINT_RE = re.compile(r'^\s*(.*?\bCHECK\b\s*\(.*\))\s*,?\s*$', re.IGNORECASE | re.MULTILINE)
+
+# DDL templates shared by every table; composing from one module-level SQL
+# object avoids re-parsing the template text per foreign key / index / drop
+FK_SQL_TEMPLATE = SQL("ALTER TABLE {table_name} ADD CONSTRAINT {key_name}  FOREIGN KEY ({column}) REFERENCES {other_table} ({other_column})")
+INDEX_SQL_TEMPLATE = SQL("CREATE INDEX {index_name} ON {table_name} ({columns})")
+INDEX_COLUMN_SQL_TEMPLATE = SQL("{name} {sort_order}")
+DROP_TABLE_SQL_TEMPLATE = SQL("DROP TABLE IF EXISTS {table_name} CASCADE;")
+
 logger = structlog.get_logger(__name__)
 
 
@@ -146,25 +232,30 @@ class PGSqlite(object):
         return await asyncio.gather(*(sem_task(coro) for coro in coros))
 
     def boolean_transformer(self, val: Any, nullable: bool) -> Union[bool, None]:
-        if nullable and not val:
-            return None
-        if not nullable and not val:
+        # NOTE: a false value (0, "false", ...) is not the same as a missing
+        # one; only None/empty maps to NULL. The old `not val` test also
+        # crashed on integer 0 by falling through to val.lower().
+        if val is None or val == "":
+            if nullable:
+                return None
             raise Exception("Value is None but column is not nullable")
 
-        if val == 1 or val.lower() == "true":
-            return "TRUE"
-        return "FALSE"
-
-
+        if isinstance(val, str):
+            val = val.lower()
+        try:
+            return BOOLEAN_VALUE_MAP[val]
+        except KeyError:
+            raise Exception(f"Unrecognized BOOLEAN value: {val!r}") from None
 
-    def __init__(self, sqlite_filename: str, pg_conninfo: str, show_sample_data: bool = False, max_import_concurrency: int = 10) -> None:
+    def __init__(self, sqlite_filename: str, pg_conninfo: str, show_sample_data: bool = False, max_import_concurrency: int = 10, unlogged_staging: bool = False) -> None:
         self.sqlite_filename = sqlite_filename
         self.pg_conninfo = pg_conninfo
+        self.unlogged_staging = unlogged_staging
         self._tables = None
         self.tables_sql = []
         self.fks_sql = []
         self.indexes_sql = []
-        self.checks_sql_by_table = {}
+        self.checks_sql_by_table = defaultdict(list)
         self.summary = {}
         self.summary["tables"] = {}
         self.summary["tables"]["columns"] = {}
@@ -179,8 +270,13 @@ class PGSqlite(object):
         self.transformers['BOOLEAN'] = self.boolean_transformer
         self.show_sample_data = show_sample_data
         self.max_import_concurrency = max_import_concurrency
-        db = Database(self.sqlite_filename)
-        self._tables = {t.name: ParsedTable(t) for t in db.tables}
+        self._tables = {t.name: ParsedTable(t) for t in self.db.tables}
+
+    @cached_property
+    def db(self) -> Database:
+        # Schema introspection (PRAGMA table_info / index_list per table) is
+        # expensive on large schemas, so share one Database for the whole run
+        return Database(self._open_sqlite_reader())
 
     @property
     def tables(self):
@@ -203,31 +299,32 @@ class PGSqlite(object):
         # This is a little interesting. We can't use sqlglot.transpile directly, since we need to
         # avoid creating the foreign keys until we've loaded the data, and we don't support views/etc. 
         # So we assemble the rest of the table DDL by hand.
-        create_sql = SQL("CREATE TABLE {table_name} (").format(table_name=Identifier(table.transpiled_name))
-        columns_sql = []
-        cols = {}
-        already_created_pks = [] 
+        # Unlogged staging tables skip WAL during the bulk load; they are
+        # flipped to logged once populate_postgres finishes
+        create_keyword = SQL("CREATE UNLOGGED TABLE") if self.unlogged_staging else SQL("CREATE TABLE")
+        create_sql = SQL("{create_keyword} {table_name} (").format(create_keyword=create_keyword, table_name=Identifier(table.transpiled_name))
+        # columns are sorted by column id, so they are created in the "correct" order for any later INSERTS that use the order from, eg, sqlite3.iterdump()
+        # Each table-body entry (column defs, then the PK constraint, then any
+        # checks) gets appended to body_sql and joined exactly once at the end,
+        # rather than re-joining a fresh Composed per section.
+        body_sql = []
+        already_created_pks = []
         for col in table.columns:
             # Fix for issues in sqlglot
-            # NOTE: embedded foreign key references are already stripped from parsed_column 
+            # NOTE: embedded foreign key references are already stripped from parsed_column
             col_sql_str = col.parsed_column.sql(dialect="postgres")
             if "SERIAL" in col_sql_str:
                 col_sql_str = col_sql_str.replace("INT", "")
             if "PRIMARY KEY SERIAL" in col_sql_str:
                 col_sql_str = col_sql_str.replace("PRIMARY KEY SERIAL", "SERIAL PRIMARY KEY")
-            cols[col.source_name] = SQL(col_sql_str)
+            body_sql.append(SQL(col_sql_str))
             if "PRIMARY KEY" in col_sql_str:
                 # don't re-add this constraint later
                 already_created_pks.append(col.source_name)
-
-        # columns are sorted by column id, so they are created in the "correct" order for any later INSERTS that use the order from, eg, sqlite3.iterdump()
-        for column in table.columns:
-            columns_sql.append(cols[column.source_name])
         self.summary["tables"]["columns"][table.source_name] = {
             "status": "PREPARED",
             "count": len(table.columns),
         }
-        all_column_sql = SQL(",\n").join(columns_sql)
 
         # sqlite appears to generate PK names by splitting on the CamelCasing for the first word, concatting, and prefixing with PK_
         # So let's do something similar
@@ -235,31 +332,27 @@ class PGSqlite(object):
         if pks_to_add and not table.src_table.use_rowid:
             # Need to map pk columns to transpiled identifiers
             transpiled_pks_to_add = [table.get_transpiled_colname(pk) for pk in pks_to_add]
-            all_column_sql = all_column_sql + SQL(",\n")
             pk_name = f"PK_{table.source_name}_" + ''.join(pks_to_add)
-            pk_sql = SQL("    CONSTRAINT {pk_name} PRIMARY KEY ({pks})").format(
-                    table_name=Identifier(table.transpiled_name),
+            body_sql.append(SQL("    CONSTRAINT {pk_name} PRIMARY KEY ({pks})").format(
                     pk_name=Identifier(pk_name), pks=SQL(", ").join(
                         [Identifier(t) for t in transpiled_pks_to_add]
                     ),
-            )
-            all_column_sql = SQL("    ").join([all_column_sql, pk_sql])
+            ))
         self.summary["tables"]["pks"][table.source_name] = {
             "status": "PREPARED",
             "count": len(table.src_table.pks),
         }
 
         self.summary["tables"]["checks"][table.source_name] = {}
-        if self.checks_sql_by_table[table.source_name] and not _IGNORE_CHECKS:
-            all_column_sql = all_column_sql + SQL(",\n")
-            check_sql = SQL(",\n").join(self.checks_sql_by_table[table.source_name])
-            all_column_sql = SQL("").join([all_column_sql, check_sql])
+        table_checks = self.checks_sql_by_table.get(table.source_name, ())
+        if table_checks and not _IGNORE_CHECKS:
+            body_sql.extend(table_checks)
             self.summary["tables"]["checks"][table.source_name]["status"] = "PREPARED"
         else:
             self.summary["tables"]["checks"][table.source_name]["status"] = "IGNORED"
-        self.summary["tables"]["checks"][table.source_name]["count"] = len(self.checks_sql_by_table[table.source_name])
+        self.summary["tables"]["checks"][table.source_name]["count"] = len(table_checks)
 
-        create_sql = SQL("\n").join([create_sql, all_column_sql, SQL(");")])
+        create_sql = SQL("\n").join([create_sql, SQL(",\n").join(body_sql), SQL(");")])
 
         return create_sql
 
@@ -269,7 +362,7 @@ class PGSqlite(object):
         # create the foreign keys after the tables to avoid having to figure out the dep graph
         for fk in table.src_table.foreign_keys:
             fk_name = f"FK_{fk.other_table}_{fk.other_column}"
-            fk_sql = SQL("ALTER TABLE {table_name} ADD CONSTRAINT {key_name}  FOREIGN KEY ({column}) REFERENCES {other_table} ({other_column})").format(
+            fk_sql = FK_SQL_TEMPLATE.format(
                 table_name=Identifier(table.transpiled_name),
                 column=Identifier(table.get_transpiled_colname(fk.column)),
                 key_name=Identifier(fk_name),
@@ -293,12 +386,12 @@ class PGSqlite(object):
                 order = "ASC"
                 if col.desc:
                     order="DESC"
-                col_sql.append(SQL("{name} {sort_order}").format(
+                col_sql.append(INDEX_COLUMN_SQL_TEMPLATE.format(
                     name=Identifier(table.get_transpiled_colname(col.name)),
                     sort_order=SQL(order)),
                 )
 
-            index_sql = SQL("CREATE INDEX {index_name} ON {table_name} ({columns})").format(
+            index_sql = INDEX_SQL_TEMPLATE.format(
                 index_name = Identifier(index.name),
                 table_name=Identifier(table.transpiled_name),
                 columns=SQL(",").join(col_sql)
@@ -312,12 +405,21 @@ class PGSqlite(object):
 
     def _drop_tables(self):
         with psycopg.connect(conninfo=self.pg_conninfo) as conn:
-            with conn.cursor() as cur:
+            # Pipeline the drops so N tables cost one network flight, not N
+            with conn.pipeline(), conn.cursor() as cur:
                 for table in self.tables:
                     cur.execute(
-                        SQL("DROP TABLE IF EXISTS {table_name} CASCADE;").format(table_name=Identifier(table.transpiled_name))
+                        DROP_TABLE_SQL_TEMPLATE.format(table_name=Identifier(table.transpiled_name))
                     )
 
+    def _drop_everything(self):
+        # Much faster than object-by-object drops when the caller wants a
+        # clean slate: recreate the public schema wholesale
+        with psycopg.connect(conninfo=self.pg_conninfo) as conn:
+            with conn.cursor() as cur:
+                cur.execute(SQL("DROP SCHEMA public CASCADE;"))
+                cur.execute(SQL("CREATE SCHEMA public;"))
+
     def get_all_tables_in_postgres(self) -> Optional[List[Any]]:
         tables_in_postgres = []
         with psycopg.connect(conninfo=self.pg_conninfo,  row_factory=dict_row) as conn:
@@ -347,19 +449,20 @@ class PGSqlite(object):
 
     def check_for_matching_tables(self) -> bool:
         # Note for later PR: implement me
-        db = Database(self.sqlite_filename)
         tables_in_postgres = self.get_all_tables_in_postgres()
         return False
 
     def load_schema(self, drop_existing_postgres_tables: bool = False) -> None:
-        db = Database(self.sqlite_filename)
         if drop_existing_postgres_tables:
             self._drop_tables()
 
-        self.checks_sql_by_table = self.get_check_constraints()
+        # With checks ignored (the current default) there is no point scanning
+        # every table's DDL for CHECK clauses on every run
+        if not _IGNORE_CHECKS:
+            self.checks_sql_by_table = self.get_check_constraints()
         for table in self.tables:
             if table.source_name in SQLITE_SYSTEM_TABLES:
-                logger.debug(f"sqlite system table found: {table.source_name}")
+                logger.debug("sqlite system table found", table=table.source_name)
                 continue
             self.tables_sql.append(self.get_table_sql(table))
             self.fks_sql.extend(self.get_fk_sql(table))
@@ -367,7 +470,7 @@ class PGSqlite(object):
 
         if not _IGNORE_VIEWS:
             logger.debug("Ignoring views", db_filename=self.sqlite_filename)
-            for view in db.views:
+            for view in self.db.views:
                 # there's a bug here in the sqlite_utils library where this fails
                 logger.debug(f"DB view: {view}", view=view)
                 self.summary["views"][view.name] = {
@@ -375,80 +478,244 @@ class PGSqlite(object):
                 }
         if not _IGNORE_TRIGGERS:
             logger.debug("Ignoring views")
-            for trigger in db.triggers:
+            for trigger in self.db.triggers:
                 logger.debug(f"DB trigger: {trigger}", trigger=trigger)
                 self.summary["triggers"][trigger.name] = {
                     "status": "IGNORED",
                 }
 
-    async def create_index(self, index_sql: str) -> None:
-        async with await psycopg.AsyncConnection.connect(conninfo=self.pg_conninfo) as conn:
+    async def create_index(self, index_sql: SQL, pool: AsyncConnectionPool) -> None:
+        async with pool.connection() as conn:
+            # Index builds sort the whole table; give them room to do it in
+            # memory rather than spilling to disk at the default 64MB
+            await conn.execute("SET LOCAL maintenance_work_mem = '512MB'")
             async with conn.cursor() as pg_cur:
-                index_str = index_sql.as_string(conn)
-                logger.debug(f"Creating index with: {index_str}")
+                # Pass the Composed as a key/value so it is only rendered
+                # when DEBUG is actually enabled; as_string() serializes the
+                # whole statement even when the line would be dropped
+                logger.debug("Creating index", sql=index_sql)
                 await pg_cur.execute(index_sql)
-                logger.debug(f"Finished creating index with: {index_str}")
-
-    async def write_table_data(self, table: ParsedTable) -> None:
-        sl_conn = sqlite3.connect(self.sqlite_filename)
-        sl_cur = sl_conn.cursor()
-        logger.info(f"Loading data into {table}", table=table.transpiled_name)
-        # Given the table name came from the SQLITE database, and we're using it
-        # to read from the sqlite database, we are okay with the literal substitution here
-        sl_cur.execute(f'SELECT * FROM "{table.source_name}"')
-        nullable_column_indexes = []
-        for idx, c in enumerate(table.columns):
-            if not c.src_column.notnull:
-                nullable_column_indexes.append(idx)
-
-        # For any non-null column, allow convert from empty string to None
-        async with await psycopg.AsyncConnection.connect(conninfo=self.pg_conninfo) as conn:
-            async with conn.cursor() as pg_cur:
-                async with pg_cur.copy(f'COPY "{table.transpiled_name}" FROM STDIN') as copy:
-                    rows_copied = 0
-                    for row in sl_cur:
-                        row = list(row)
-                        for idx, c in enumerate(table.columns):
-                            if c.src_column.type in self.transformers:
-                                row[idx] = self.transformers[c.src_column.type](row[idx], not c.src_column.notnull)
-                            if not c.src_column.notnull:
-                                # for numeric types, we need to be we don't evaluate False on a 0
-                                if row[idx] != 0 and not row[idx]:
-                                    row[idx] = None
-
-                        await copy.write_row(row)
-                        rows_copied += 1
-                        if rows_copied % 1000 == 0:
-                            self.summary["tables"]["data"][table.source_name]["status"] = f"LOADED {rows_copied}"
-
-                    self.summary["tables"]["data"][table.source_name]["status"] = f"LOADED {rows_copied}"
-                logger.info(f"Finished loading {rows_copied} rows of data into {table.transpiled_name}")
-
-        sl_conn.close()
+                logger.debug("Finished creating index", sql=index_sql)
+
+    def _open_sqlite_reader(self) -> sqlite3.Connection:
+        # Tune the connection for large sequential scans: mmap the file
+        # instead of read() syscalls and grow the page cache (negative value
+        # is KiB, so 256MiB). query_only guards the source database — we must
+        # never write to (or even re-journal) our input, and it keeps the
+        # reader working on read-only files and filesystems.
+        conn = sqlite3.connect(self.sqlite_filename, isolation_level=None)
+        cur = conn.cursor()
+        cur.execute("PRAGMA query_only=1")
+        cur.execute("PRAGMA mmap_size=1073741824")
+        cur.execute("PRAGMA cache_size=-262144")
+        cur.close()
+        return conn
+
+    def get_binary_copy_types(self, table: ParsedTable) -> Optional[List[str]]:
+        # Binary COPY skips the per-value text formatting and quoting that the
+        # generic text adapters do, but every field must arrive in the exact
+        # wire format of the destination column. Map each column's transpiled
+        # type to a psycopg type name; if any column can't be mapped, return
+        # None and the caller stays on text-format COPY.
+        types = []
+        for col in table.columns:
+            # Typeless SQLite columns (transpiled as TEXT) have no affinity,
+            # so the stored values can be ints/floats/bytes as written —
+            # psycopg's text-OID binary dumper would reject those, so the
+            # table has to stay on text COPY
+            if col.src_column.type == "":
+                return None
+            kind = col.parsed_column.args.get("kind")
+            if kind is None:
+                return None
+            base_type = kind.sql(dialect="postgres").split("(")[0].strip().upper()
+            if base_type not in PG_BINARY_COPY_TYPES:
+                return None
+            types.append(PG_BINARY_COPY_TYPES[base_type])
+        return types
+
+    async def write_table_data(self, table: ParsedTable, pool: AsyncConnectionPool) -> None:
+        logger.info("Loading data", table=table.transpiled_name)
+        # Precompute a per-column rewrite plan so the row loop doesn't repeat
+        # the transformer lookup and notnull attribute walk for every cell.
+        # Columns with no transformer that are also NOT NULL pass through
+        # untouched, so they are dropped from the plan entirely.
+        plan = [
+            (idx, self.transformers.get(c.src_column.type), not c.src_column.notnull)
+            for idx, c in enumerate(table.columns)
+        ]
+        # Split the plan so the common case — nullable columns with no
+        # transformer, which is every plain numeric/text column on a wide
+        # table — runs a bare index loop with one comparison per cell instead
+        # of unpacking and testing a transformer slot per column
+        transform_plan = [(idx, tf, nullable) for idx, tf, nullable in plan if tf]
+        nullable_only_idx = [idx for idx, tf, nullable in plan if nullable and not tf]
+        needs_rewrite = bool(transform_plan or nullable_only_idx)
+
+        binary_copy_types = self.get_binary_copy_types(table)
+        copy_format = SQL(" WITH (FORMAT BINARY)") if binary_copy_types else SQL("")
+        copy_sql = SQL("COPY {table_name} ({columns}) FROM STDIN{copy_format}").format(
+            table_name=Identifier(table.transpiled_name),
+            columns=SQL(", ").join(Identifier(c.transpiled_name) for c in table.columns),
+            copy_format=copy_format,
+        )
+
+        # Read SQLite in a worker thread while the COPY consumer runs on the
+        # event loop, so B-tree decode overlaps the Postgres network write
+        # (and the sqlite3 connection is no longer opened inside a coroutine).
+        # The queue is bounded so a fast reader can't buffer the whole table.
+        queue: asyncio.Queue = asyncio.Queue(maxsize=4)
+        loop = asyncio.get_running_loop()
+
+        def read_table_rows():
+            # sqlite3 objects must be used on the thread that created them
+            sl_conn = self._open_sqlite_reader()
+            try:
+                sl_cur = sl_conn.cursor()
+                sl_cur.arraysize = COPY_BATCH_SIZE
+                # Given the table name came from the SQLITE database, and we're using it
+                # to read from the sqlite database, we are okay with the literal substitution here
+                sl_cur.execute(f'SELECT * FROM "{table.source_name}"')
+                while rows := sl_cur.fetchmany(COPY_BATCH_SIZE):
+                    asyncio.run_coroutine_threadsafe(queue.put(rows), loop).result()
+            except BaseException as exc:
+                # Hand the failure to the consumer, which re-raises it inside
+                # the COPY block so the copy aborts (CopyFail) and the partial
+                # table rolls back instead of committing as "loaded"
+                asyncio.run_coroutine_threadsafe(queue.put(exc), loop).result()
+            else:
+                # Plain end-of-data sentinel
+                asyncio.run_coroutine_threadsafe(queue.put(None), loop).result()
+            finally:
+                sl_conn.close()
+
+        # One reusable buffer instead of a fresh list(row) allocation per row;
+        # both consumers below serialize the rewritten row before asking for
+        # the next one, so the buffer is free to be overwritten by then
+        row_buf = [None] * len(table.columns)
+
+        def rewrite_row(row):
+            row_buf[:] = row
+            for idx, tf, nullable in transform_plan:
+                val = tf(row_buf[idx], nullable)
+                if nullable and (val == "" or val == b""):
+                    val = None
+                row_buf[idx] = val
+            # Empty strings/blobs in nullable columns load as NULL; this says
+            # so directly instead of the old "falsy but not 0" dance, which
+            # can't trip over numeric zeros or False by construction
+            for idx in nullable_only_idx:
+                val = row_buf[idx]
+                if val == "" or val == b"":
+                    row_buf[idx] = None
+            return row_buf
+
+        reader = asyncio.create_task(asyncio.to_thread(read_table_rows))
+        rows_copied = 0
+        # Resolve the summary entry once; the batch loop then does a single
+        # integer dict write instead of the four-lookup chain plus an f-string
+        status_dict = self.summary["tables"]["data"].setdefault(table.source_name, {})
+        copy_failed = False
+        try:
+            # For any non-null column, allow convert from empty string to None
+            async with pool.connection() as conn:
+                # No point waiting on a WAL fsync per COPY transaction for a
+                # bulk load; the data is re-runnable if the server crashes
+                await conn.execute("SET LOCAL synchronous_commit = off")
+                async with conn.cursor() as pg_cur:
+                    async with pg_cur.copy(copy_sql) as copy:
+                        if binary_copy_types:
+                            copy.set_types(binary_copy_types)
+                        while (rows := await queue.get()) is not None:
+                            if isinstance(rows, BaseException):
+                                raise rows
+                            if binary_copy_types:
+                                if needs_rewrite:
+                                    for row in rows:
+                                        await copy.write_row(rewrite_row(row))
+                                else:
+                                    # SQLite's tuples go straight through
+                                    for row in rows:
+                                        await copy.write_row(row)
+                            else:
+                                # Text fallback: encode the whole batch
+                                # ourselves and hand COPY one buffer, instead
+                                # of psycopg adapting cell by cell per row
+                                if needs_rewrite:
+                                    buf = "".join([encode_copy_text_row(rewrite_row(row)) for row in rows])
+                                else:
+                                    buf = "".join(map(encode_copy_text_row, rows))
+                                await copy.write(buf)
+                            rows_copied += len(rows)
+                            status_dict["rows"] = rows_copied
+
+                    status_dict["rows"] = rows_copied
+                    status_dict["status"] = f"LOADED {rows_copied}"
+                logger.info("Finished loading data", table=table.transpiled_name, rows=rows_copied)
+        except BaseException:
+            copy_failed = True
+            raise
+        finally:
+            # If the COPY failed, the reader may be blocked on a full queue;
+            # drain until it finishes
+            while not reader.done():
+                while not queue.empty():
+                    queue.get_nowait()
+                await asyncio.sleep(0.01)
+            try:
+                await reader
+            except Exception:
+                # Read errors travel through the queue and were raised inside
+                # the COPY block above; don't let awaiting the task replace an
+                # in-flight exception with a secondary one. But if the COPY
+                # itself succeeded, a reader failure is the primary error and
+                # must surface.
+                if not copy_failed:
+                    raise
 
     def load_data_to_postgres(self):
-        db = Database(self.sqlite_filename)
-        sl_conn = sqlite3.connect(self.sqlite_filename)
+        sl_conn = self._open_sqlite_reader()
         sl_cur = sl_conn.cursor()
-        for table in db.tables:
-            # Given the table name came from the SQLITE database, and we're using it
-            # to read from the sqlite database, we are okay with the literal substitution here
-            sl_cur.execute(f'SELECT count(*) FROM "{table.name}"')
-            self.summary["tables"]["data"][table.name] = {
-                "row_count": sl_cur.fetchone()[0],
-                "status": "PREPARED",
-            }
+        tables = list(self.tables)
+        # Count all tables with one compound query per 500 tables (SQLite's
+        # SQLITE_MAX_COMPOUND_SELECT limit) instead of a round-trip each.
+        # Given the table names came from the SQLITE database, and we're using
+        # them to read from the sqlite database, we are okay with the literal
+        # substitution here
+        for chunk_start in range(0, len(tables), 500):
+            chunk = tables[chunk_start:chunk_start + 500]
+            count_sql = " UNION ALL ".join(
+                f'SELECT {i} AS ord, count(*) FROM "{t.source_name}"'
+                for i, t in enumerate(chunk)
+            )
+            sl_cur.execute(count_sql)
+            for ord_idx, row_count in sl_cur.fetchall():
+                self.summary["tables"]["data"][chunk[ord_idx].source_name] = {
+                    "row_count": row_count,
+                    "status": "PREPARED",
+                }
         sl_conn.close()
 
         async def load_all_data():
-            await self.gather_with_concurrency(
-                self.max_import_concurrency,
-                *[
-                    self.write_table_data(table)
-                    for table in self.tables
-                    if table.source_name not in SQLITE_SYSTEM_TABLES
-                ],
-            )
+            # One bounded pool for all table copies: gather_with_concurrency
+            # caps how many copies run at once, and the pool keeps that many
+            # warm backends rather than reconnecting per table
+            tables_to_load = [
+                table
+                for table in self.tables
+                if table.source_name not in SQLITE_SYSTEM_TABLES
+            ]
+            pool_size = max(1, min(len(tables_to_load), self.max_import_concurrency))
+            async with AsyncConnectionPool(
+                conninfo=self.pg_conninfo,
+                min_size=min(4, pool_size),
+                max_size=pool_size,
+                open=False,  # the async-with opens it; opening from __init__ is deprecated
+            ) as pool:
+                await self.gather_with_concurrency(
+                    self.max_import_concurrency,
+                    *[self.write_table_data(table, pool) for table in tables_to_load],
+                )
         load_results = asyncio.run(load_all_data())
 
         if self.show_sample_data:
@@ -456,41 +723,39 @@ class PGSqlite(object):
                 with psycopg.connect(conninfo=self.pg_conninfo) as conn:
                     with conn.cursor() as cur:
                         cur.execute(f'SELECT * from "{table.transpiled_name}" LIMIT 10')
-                        logger.debug(f"Data in {table.transpiled_name}")
-                        logger.debug(cur.fetchall())
+                        logger.debug("Sample data", table=table.transpiled_name, rows=cur.fetchall())
 
     def get_summary(self) -> Dict[str, Any]:
         return self.summary
 
     def get_check_constraints(self):
-        sl_conn = sqlite3.connect(self.sqlite_filename)
+        sl_conn = self._open_sqlite_reader()
         sl_cur = sl_conn.cursor()
-        sl_cur.execute('select name, sql from sqlite_master where type="table"')
-        checks = {}
-        for row in sl_cur:
-            checks[row[0]] = []
-            transpile = ""
-            for line in row[1].split('\n'):
-                if "CHECK" in line:
-                    start = line.index("(")
-                    end = line.rindex(")")
-                    sql_expr= line[start + 1:end]
-                    clean_check_str = "    " + line.strip().rstrip(',')
-                    checks[row[0]].append(SQL(clean_check_str))
-                else:
-                    transpile = transpile + "\n" + line
-            transpile = transpile.replace('[', '"').replace(']', '"') # Handle SQLite table names that are [foo]
-            transpile = transpile.replace('`', '"') # Handle SQLLite table names that are `foo`
+        # Most schemas have no CHECK constraints at all, so let sqlite_master
+        # filter the candidates instead of scanning every table's DDL here.
+        # defaultdict so tables skipped by the filter read as "no checks".
+        sl_cur.execute('select name, sql from sqlite_master where type="table" and sql like "%CHECK%"')
+        checks = defaultdict(list)
+        for name, sql_text in sl_cur:
+            checks[name] = [
+                SQL("    " + m.group(1))
+                for m in CHECK_CONSTRAINT_RE.finditer(sql_text)
+            ]
         sl_conn.close()
 
         return checks
 
     def populate_postgres(self)-> None:
+        # Pipeline mode keeps all the CREATE TABLE statements in flight on one
+        # connection instead of paying a round-trip per statement, and the
+        # surrounding transaction means a failed create rolls the batch back
         with psycopg.connect(conninfo=self.pg_conninfo) as conn:
-            with conn.cursor() as cur:
+            # Prepare on first execution so any statement text that repeats
+            # (identical DDL across schemas) reuses its parse on the server
+            conn.prepare_threshold = 0
+            with conn.pipeline(), conn.cursor() as cur:
                 for create_sql in self.tables_sql:
-                    logger.debug("Running SQL:")
-                    logger.debug(create_sql.as_string(conn))
+                    logger.debug("Running DDL", sql=create_sql)
                     cur.execute(create_sql)
             for column in self.summary["tables"]["columns"].values():
                 column["status"] = "CREATED"
@@ -500,21 +765,48 @@ class PGSqlite(object):
         self.load_data_to_postgres()
 
         async def create_all_indexes():
-            await self.gather_with_concurrency(self.max_import_concurrency, *[self.create_index(index) for index in self.indexes_sql])
+            # Index builds are independent of each other here (the tables are
+            # freshly loaded with no other readers, so plain CREATE INDEX
+            # doesn't block anything); run them on a bounded pool so builds
+            # overlap across cores instead of queueing on one connection
+            if self.indexes_sql:
+                pool_size = max(1, min(len(self.indexes_sql), self.max_import_concurrency))
+                async with AsyncConnectionPool(
+                    conninfo=self.pg_conninfo,
+                    min_size=min(4, pool_size),
+                    max_size=pool_size,
+                    open=False,  # the async-with opens it; opening from __init__ is deprecated
+                ) as pool:
+                    await self.gather_with_concurrency(
+                        self.max_import_concurrency,
+                        *[self.create_index(index, pool) for index in self.indexes_sql],
+                    )
             for table in self.summary["tables"]["indexes"]:
                 self.summary["tables"]["indexes"][table]["status"] = "CREATED"
 
         asyncio.run(create_all_indexes())
 
         with psycopg.connect(conninfo=self.pg_conninfo) as conn:
-            with conn.cursor() as cur:
+            conn.prepare_threshold = 0
+            with conn.pipeline(), conn.cursor() as cur:
                 for fk in self.fks_sql:
-                    logger.debug("Running SQL:")
-                    logger.debug(fk.as_string(conn))
+                    logger.debug("Running DDL", sql=fk)
                     cur.execute(fk)
-                for table in self.summary["tables"]["fks"]:
-                    self.summary["tables"]["fks"][table]["status"] = "CREATED"
-                # todo: add checks, views, triggers.
+            for table in self.summary["tables"]["fks"]:
+                self.summary["tables"]["fks"][table]["status"] = "CREATED"
+            # todo: add checks, views, triggers.
+
+        if self.unlogged_staging:
+            # Flip the staging tables to logged now that data and indexes are
+            # in place; this WAL-logs each table once rather than per row
+            with psycopg.connect(conninfo=self.pg_conninfo) as conn:
+                with conn.pipeline(), conn.cursor() as cur:
+                    for table in self.tables:
+                        if table.source_name in SQLITE_SYSTEM_TABLES:
+                            continue
+                        cur.execute(
+                            SQL("ALTER TABLE {table_name} SET LOGGED;").format(table_name=Identifier(table.transpiled_name))
+                        )
 
 
 if __name__ == "__main__":
@@ -552,6 +844,12 @@ if __name__ == "__main__":
         default=False,
         help="After import, show up to 10 rows of the imported data in each table.",
     )
+    parser.add_argument(
+        "--unlogged_staging",
+        type=bool,
+        default=False,
+        help="Create tables UNLOGGED for the data load and switch them to LOGGED after import; faster, but the data is lost if the server crashes mid-import",
+    )
     parser.add_argument(
         "--drop_tables",
         type=bool,
@@ -580,7 +878,9 @@ if __name__ == "__main__":
     sqlite_filename = args.sqlite_filename
     pg_conninfo = args.postgres_connect_url
 
-    loader = PGSqlite(sqlite_filename, pg_conninfo, show_sample_data=args.show_sample_data, max_import_concurrency=args.max_import_concurrency)
+    loader = PGSqlite(sqlite_filename, pg_conninfo, show_sample_data=args.show_sample_data, max_import_concurrency=args.max_import_concurrency, unlogged_staging=args.unlogged_staging)
+    if args.drop_everything:
+        loader._drop_everything()
     loader.load_schema(drop_existing_postgres_tables=args.drop_tables)
     loader.populate_postgres()
     logger.debug(json.dumps(loader.get_summary(), indent=2))